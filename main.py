@@ -1,18 +1,99 @@
 # main.py
 
+from typing import Callable, Dict, Optional
+
 from modelos.producto import Producto
 from servicios.inventario import Inventario
 
 
+# Texto del menú principal, armado una sola vez
+_MENU = "\n".join((
+    "\n===== SISTEMA DE INVENTARIO DG =====",
+    "1. Añadir producto",
+    "2. Eliminar producto",
+    "3. Actualizar producto",
+    "4. Buscar producto",
+    "5. Listar inventario",
+    "0. Salir",
+))
+
+
 # Función que muestra el menú principal
 def mostrar_menu():
-    print("\n===== SISTEMA DE INVENTARIO DG =====")
-    print("1. Añadir producto")
-    print("2. Eliminar producto")
-    print("3. Actualizar producto")
-    print("4. Buscar producto")
-    print("5. Listar inventario")
-    print("0. Salir")
+    print(_MENU)
+
+
+# Opción 1: Añadir producto
+def _opcion_anadir(inventario: Inventario) -> None:
+    idp = input("ID: ")
+    nombre = input("Nombre: ")
+    cantidad = int(input("Cantidad: "))
+    precio = float(input("Precio: "))
+
+    producto = Producto(idp, nombre, cantidad, precio)
+
+    if inventario.anadir_producto(producto):
+        print("Producto añadido correctamente.")
+    else:
+        print("Error: El ID ya existe.")
+
+
+# Opción 2: Eliminar producto
+def _opcion_eliminar(inventario: Inventario) -> None:
+    idp = input("ID del producto a eliminar: ")
+    if inventario.eliminar_producto(idp):
+        print("Producto eliminado.")
+    else:
+        print("Producto no encontrado.")
+
+
+# Opción 3: Actualizar producto
+def _opcion_actualizar(inventario: Inventario) -> None:
+    idp = input("ID del producto a actualizar: ")
+    nueva_cantidad = int(input("Nueva cantidad: "))
+    nuevo_precio = float(input("Nuevo precio: "))
+
+    if inventario.actualizar_producto(idp, nueva_cantidad, nuevo_precio):
+        print("Producto actualizado.")
+    else:
+        print("Producto no encontrado.")
+
+
+# Opción 4: Buscar producto
+def _opcion_buscar(inventario: Inventario) -> None:
+    texto = input("Ingrese nombre o parte del nombre: ")
+    resultados = inventario.buscar_por_nombre(texto)
+
+    for producto in resultados:
+        print(producto)
+
+
+# Opción 5: Listar inventario
+def _opcion_listar(inventario: Inventario) -> None:
+    for producto in inventario.listar_productos():
+        print(producto)
+
+
+# Opción 0: Salir (devuelve False para terminar el ciclo)
+def _opcion_salir(inventario: Inventario) -> bool:
+    print("Saliendo del sistema...")
+    inventario.close()
+    return False
+
+
+def _opcion_invalida(inventario: Inventario) -> None:
+    print("Opción inválida.")
+
+
+# Tabla de despacho: opción del menú -> función que la atiende
+MANEJADORES: Dict[str, Callable[[Inventario], Optional[bool]]] = {
+    "1": _opcion_anadir,
+    "2": _opcion_eliminar,
+    "3": _opcion_actualizar,
+    "4": _opcion_buscar,
+    "5": _opcion_listar,
+    "0": _opcion_salir,
+}
 
 
 # Función principal del programa
@@ -23,61 +104,9 @@ def main():
     while True:
         mostrar_menu()
         opcion = input("Seleccione una opción: ")
-
-        # Opción 1: Añadir producto
-        if opcion == "1":
-            idp = input("ID: ")
-            nombre = input("Nombre: ")
-            cantidad = int(input("Cantidad: "))
-            precio = float(input("Precio: "))
-
-            producto = Producto(idp, nombre, cantidad, precio)
-
-            if inventario.anadir_producto(producto):
-                print("Producto añadido correctamente.")
-            else:
-                print("Error: El ID ya existe.")
-
-        # Opción 2: Eliminar producto
-        elif opcion == "2":
-            idp = input("ID del producto a eliminar: ")
-            if inventario.eliminar_producto(idp):
-                print("Producto eliminado.")
-            else:
-                print("Producto no encontrado.")
-
-        # Opción 3: Actualizar producto
-        elif opcion == "3":
-            idp = input("ID del producto a actualizar: ")
-            nueva_cantidad = int(input("Nueva cantidad: "))
-            nuevo_precio = float(input("Nuevo precio: "))
-
-            if inventario.actualizar_producto(idp, nueva_cantidad, nuevo_precio):
-                print("Producto actualizado.")
-            else:
-                print("Producto no encontrado.")
-
-        # Opción 4: Buscar producto
-        elif opcion == "4":
-            texto = input("Ingrese nombre o parte del nombre: ")
-            resultados = inventario.buscar_por_nombre(texto)
-
-            for producto in resultados:
-                print(producto)
-
-        # Opción 5: Listar inventario
-        elif opcion == "5":
-            for producto in inventario.listar_productos():
-                print(producto)
-
-        # Opción 0: Salir
-        elif opcion == "0":
-            print("Saliendo del sistema...")
+        if MANEJADORES.get(opcion, _opcion_invalida)(inventario) is False:
             break
 
-        else:
-            print("Opción inválida.")
-
 
 # Punto de entrada del programa
 if __name__ == "__main__":
@@ -2,13 +2,19 @@
 
 # Clase que representa la entidad Producto
 class Producto:
-    
+
+    # Atributos fijos: sin __dict__ por instancia (menos memoria, acceso más rápido)
+    __slots__ = ("_id", "_nombre", "_cantidad", "_precio", "_nombre_lower", "_str_cache", "_observador")
+
     # Constructor: inicializa los atributos del producto
     def __init__(self, id: str, nombre: str, cantidad: int, precio: float):
         self._id = id              # Identificador único del producto
         self._nombre = nombre      # Nombre del producto
         self._cantidad = cantidad  # Cantidad disponible en inventario
         self._precio = precio      # Precio unitario del producto
+        self._nombre_lower = nombre.lower()  # Nombre en minúsculas para búsquedas
+        self._str_cache = None     # Texto de __str__ ya formateado (se invalida en los setters)
+        self._observador = None    # Inventario que lo contiene (solo uno), avisado en los setters
 
     # -------------------
     # Métodos GETTERS
@@ -22,6 +28,10 @@ class Producto:
     def get_nombre(self) -> str:
         return self._nombre
 
+    # Devuelve el nombre en minúsculas (precalculado)
+    def get_nombre_lower(self) -> str:
+        return self._nombre_lower
+
     # Devuelve la cantidad disponible
     def get_cantidad(self) -> int:
         return self._cantidad
@@ -36,22 +46,38 @@ class Producto:
 
     # Modifica el nombre del producto
     def set_nombre(self, nombre: str) -> None:
+        # Primero se actualizan los índices del inventario, luego el producto
+        if self._observador is not None:
+            self._observador._al_cambiar_nombre(self, nombre)
         self._nombre = nombre
+        self._nombre_lower = nombre.lower()
+        self._str_cache = None
 
     # Modifica la cantidad con validación
     def set_cantidad(self, cantidad: int) -> None:
         # Validamos que la cantidad no sea negativa
         if cantidad < 0:
             raise ValueError("La cantidad no puede ser negativa.")
+        # Primero se actualizan los índices del inventario, luego el producto
+        if self._observador is not None:
+            self._observador._al_cambiar_valores(self, cantidad, self._precio)
         self._cantidad = cantidad
+        self._str_cache = None
 
     # Modifica el precio con validación
     def set_precio(self, precio: float) -> None:
         # Validamos que el precio no sea negativo
         if precio < 0:
             raise ValueError("El precio no puede ser negativo.")
+        # Primero se actualizan los índices del inventario, luego el producto
+        if self._observador is not None:
+            self._observador._al_cambiar_valores(self, self._cantidad, precio)
         self._precio = precio
+        self._str_cache = None
 
     # Método especial que permite mostrar el objeto de forma legible
+    # (se formatea una sola vez mientras el producto no cambie)
     def __str__(self) -> str:
-        return f"ID: {self._id} | Nombre: {self._nombre} | Cantidad: {self._cantidad} | Precio: ${self._precio:.2f}"
+        if self._str_cache is None:
+            self._str_cache = f"ID: {self._id} | Nombre: {self._nombre} | Cantidad: {self._cantidad} | Precio: ${self._precio:.2f}"
+        return self._str_cache
@@ -0,0 +1,122 @@
+# servicios/columnas.py
+
+from typing import Dict, Iterable, List
+
+from modelos.producto import Producto
+
+# NumPy es opcional: si no está instalado, los agregados se calculan en Python
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+# Rango de valores que las columnas representan sin pérdida
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_FLOAT_ENTERO_MAX = 2 ** 53
+
+
+def _cabe_en_columnas(cantidad, precio) -> bool:
+    """True si cantidad entra en int64 y precio en float64 sin truncar ni desbordar."""
+    if type(cantidad) is not int or not _INT64_MIN <= cantidad <= _INT64_MAX:
+        return False
+    if type(precio) is float:
+        return True
+    return type(precio) is int and -_FLOAT_ENTERO_MAX <= precio <= _FLOAT_ENTERO_MAX
+
+
+class ColumnasNumericas:
+    """
+    Copia en columnas (estructura de arreglos) de cantidades y precios:
+    - Dos arreglos contiguos de NumPy (int64 / float64) indexados por posición
+    - id -> posición en un diccionario; al eliminar se mueve el último al hueco
+    - El inventario la mantiene al día cuando los setters de Producto le
+      avisan, antes de modificar el producto
+    - Sin NumPy, o si algún valor no cabe en int64/float64, los agregados se
+      calculan en Python sobre los productos (nunca se lanza excepción)
+    """
+
+    _CAPACIDAD_INICIAL = 16
+
+    def __init__(self):
+        self._id_to_pos: Dict[str, int] = {}
+        self._productos: List[Producto] = []  # Producto en cada posición
+        self._n = 0
+        # Las columnas solo se usan mientras todos los valores quepan en ellas
+        self._usar_np = np is not None
+        if np is not None:
+            self._cantidades = np.empty(self._CAPACIDAD_INICIAL, dtype=np.int64)
+            self._precios = np.empty(self._CAPACIDAD_INICIAL, dtype=np.float64)
+
+    def reconstruir(self, productos: Iterable[Producto]) -> None:
+        """Vacía las columnas y las llena de nuevo con los productos dados."""
+        self._id_to_pos = {}
+        self._productos = []
+        self._n = 0
+        self._usar_np = np is not None
+        for producto in productos:
+            self.agregar(producto)
+
+    def _asegurar_capacidad(self, requerida: int) -> None:
+        # Crecimiento amortizado: se duplica la capacidad cuando se llena
+        capacidad = len(self._cantidades)
+        if requerida <= capacidad:
+            return
+        while capacidad < requerida:
+            capacidad *= 2
+        cantidades = np.empty(capacidad, dtype=np.int64)
+        precios = np.empty(capacidad, dtype=np.float64)
+        cantidades[:self._n] = self._cantidades[:self._n]
+        precios[:self._n] = self._precios[:self._n]
+        self._cantidades = cantidades
+        self._precios = precios
+
+    def _escribir(self, pos: int, cantidad, precio) -> None:
+        """Copia los valores a las columnas, o las desactiva si no caben."""
+        if not self._usar_np:
+            return
+        if not _cabe_en_columnas(cantidad, precio):
+            self._usar_np = False
+            return
+        self._cantidades[pos] = cantidad
+        self._precios[pos] = precio
+
+    def agregar(self, producto: Producto) -> None:
+        if self._usar_np:
+            self._asegurar_capacidad(self._n + 1)
+            self._escribir(self._n, producto._cantidad, producto._precio)
+        self._id_to_pos[producto._id] = self._n
+        self._productos.append(producto)
+        self._n += 1
+
+    def quitar(self, producto: Producto) -> None:
+        pos = self._id_to_pos.pop(producto._id, None)
+        if pos is None:
+            return
+
+        # El último elemento ocupa el hueco para mantener las columnas contiguas
+        ultimo = self._n - 1
+        movido = self._productos.pop()
+        if pos != ultimo:
+            self._productos[pos] = movido
+            self._id_to_pos[movido._id] = pos
+            if self._usar_np:
+                self._cantidades[pos] = self._cantidades[ultimo]
+                self._precios[pos] = self._precios[ultimo]
+        self._n = ultimo
+
+    def actualizar(self, producto: Producto, cantidad, precio) -> None:
+        """
+        Recibe los valores nuevos de un producto antes de que se asignen
+        (el inventario la llama desde el aviso de los setters).
+        """
+        pos = self._id_to_pos.get(producto._id)
+        if pos is not None:
+            self._escribir(pos, cantidad, precio)
+
+    def total_valor(self) -> float:
+        """Suma de cantidad * precio de todos los productos."""
+        if not self._usar_np:
+            return float(sum(p._cantidad * p._precio for p in self._productos))
+        n = self._n
+        return float((self._cantidades[:n] * self._precios[:n]).sum())
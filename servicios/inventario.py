@@ -1,28 +1,57 @@
 # servicios/inventario.py
 
+import io
+import mmap
 import os
-from typing import List, Optional, Tuple
+from collections import defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
 
 from modelos.producto import Producto
+from servicios.columnas import ColumnasNumericas
 
 
 class Inventario:
     """
     Inventario  en el cual se crea una base de datos en un archivo de texto:
     - Carga automática al iniciar desde inventario.txt
-    - Guardado automático al añadir / actualizar / eliminar
+    - Guardado automático al añadir / actualizar / eliminar: cada cambio se
+      anexa como un registro (A|..., U|..., D|id) en una sola escritura
+    - Compactación (reescritura completa) al iniciar o cuando el registro crece
+    - Los cambios hechos con los setters de Producto se registran con la
+      siguiente escritura del inventario (o al cerrar)
     - Manejo de excepciones: FileNotFoundError, PermissionError, OSError, y datos corruptos
     - Si el archivo no existe, lo crea desde cero
     """
 
-    def __init__(self, ruta_archivo: str = "inventario.txt"):
-        self._productos: List[Producto] = []
+    def __init__(self, ruta_archivo: str = "inventario.txt", umbral_compactacion: int = 64 * 1024):
+        # Índice por ID: búsqueda O(1) y conserva el orden de inserción
+        self._index: Dict[str, Producto] = {}
+        # Índice invertido trigrama -> IDs (dict como conjunto ordenado) para buscar_por_nombre
+        self._trigramas: DefaultDict[str, Dict[str, None]] = defaultdict(dict)
+        # Cantidades y precios en columnas contiguas para agregados (total_valor)
+        self._columnas = ColumnasNumericas()
         self._ruta_archivo = ruta_archivo
         self._avisos_carga: List[str] = []
 
+        # Registro incremental (append-only) sobre el mismo archivo
+        self._fd: Optional[int] = None
+        self._tam_archivo = 0
+        self._umbral_compactacion = umbral_compactacion
+        self._tam_base = 0
+        self._registros_en_archivo = 0
+        # IDs modificados mediante los setters de Producto y aún sin registrar;
+        # se anexan como 'U|...' junto con la siguiente escritura (o al cerrar)
+        self._sucios: Dict[str, None] = {}
+
         self._asegurar_archivo()
         self._cargar_desde_archivo()
 
+        # Si el archivo traía registros incrementales, se deja como foto limpia
+        if self._registros_en_archivo:
+            self._compactar()
+        else:
+            self._abrir_registro()
+
     # -------------------------
     # Utilidades (archivo)
     # -------------------------
@@ -44,61 +73,169 @@ class Inventario:
 
     def _producto_a_linea(self, producto: Producto) -> str:
         """Convierte Producto -> línea 'id|nombre|cantidad|precio'."""
-        return (
-            f"{producto.get_id()}|{producto.get_nombre()}|"
-            f"{producto.get_cantidad()}|{producto.get_precio()}"
-        )
+        # Acceso directo a los atributos: evita 4 llamadas a getters por producto
+        return f"{producto._id}|{producto._nombre}|{producto._cantidad}|{producto._precio}"
 
-    def _linea_a_producto(self, linea: str) -> Producto:
+    def _abrir_registro(self, avisar: bool = True) -> None:
+        """
+        Abre (una sola vez) un descriptor en modo anexar; se usa con os.write.
+        Si la última línea quedó a medias (caída o escritura fallida), se
+        cierra con un salto de línea para que el próximo registro no se pegue.
+        """
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_CLOEXEC", 0)
+        fd = None
+        try:
+            fd = os.open(self._ruta_archivo, flags, 0o644)
+            tam = os.lseek(fd, 0, os.SEEK_END)
+            if tam > 0 and os.pread(fd, 1, tam - 1) != b"\n":
+                tam += os.write(fd, b"\n")
+            self._fd = fd
+            self._tam_archivo = tam
+            self._tam_base = max(self._tam_base, self._tam_archivo)
+        except PermissionError as e:
+            self._descartar_fd(fd)
+            if avisar:
+                self._avisos_carga.append(
+                    f"No hay permisos para escribir en '{self._ruta_archivo}': {e}"
+                )
+        except OSError as e:
+            self._descartar_fd(fd)
+            if avisar:
+                self._avisos_carga.append(
+                    f"Error del sistema abriendo '{self._ruta_archivo}': {e}"
+                )
+
+    def _descartar_fd(self, fd: Optional[int]) -> None:
+        self._fd = None
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _cerrar_registro(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def close(self) -> None:
+        """Registra los cambios pendientes y cierra el archivo de registro."""
+        if self._sucios:
+            self._escribir_registros(b"")
+        self._cerrar_registro()
+
+    def _anexar_registro(self, tipo: str, contenido: str) -> Tuple[bool, str]:
+        """
+        Anexa un registro 'tipo|contenido' con una única llamada a write().
+        Si el registro supera el umbral, compacta el archivo.
+        """
+        return self._escribir_registros(f"{tipo}|{contenido}\n".encode("utf-8"))
+
+    def _escribir_registros(self, datos: bytes, sincronizar: bool = False) -> Tuple[bool, str]:
+        """
+        Escribe uno o varios registros ya codificados con una única llamada a write().
+        Con sincronizar=True además fuerza el volcado a disco (fsync).
+        Si el descriptor no está abierto (apertura o escritura fallida antes),
+        se reintenta abrirlo; al reabrir se repara una última línea a medias.
+        """
+        if self._fd is None:
+            self._abrir_registro(avisar=False)
+        if self._fd is None:
+            return False, f"El archivo '{self._ruta_archivo}' no está abierto para escritura."
+
+        # Cambios hechos con los setters: se anteponen en la misma escritura
+        if self._sucios:
+            datos = "".join(
+                [f"U|{self._producto_a_linea(self._index[id_])}\n" for id_ in self._sucios if id_ in self._index]
+            ).encode("utf-8") + datos
+
+        try:
+            escritos = os.write(self._fd, datos)
+            while escritos < len(datos):
+                escritos += os.write(self._fd, datos[escritos:])
+            self._tam_archivo += escritos
+            self._sucios.clear()
+            if sincronizar:
+                os.fsync(self._fd)
+        except PermissionError as e:
+            # Se cierra para que el próximo intento reabra y repare la cola
+            self._cerrar_registro()
+            return False, f"Permisos insuficientes al guardar '{self._ruta_archivo}': {e}"
+        except OSError as e:
+            self._cerrar_registro()
+            return False, f"Error del sistema al guardar '{self._ruta_archivo}': {e}"
+
+        if self._tam_archivo > 2 * max(self._tam_base, self._umbral_compactacion):
+            ok, detalle = self._compactar()
+            if not ok:
+                return True, f"Cambio registrado en '{self._ruta_archivo}', pero no se pudo compactar. {detalle}"
+
+        return True, f"Cambio registrado en '{self._ruta_archivo}'."
+
+    def _compactar(self) -> Tuple[bool, str]:
+        """
+        Reescribe el archivo con el estado actual y reabre el registro.
+        Si falla, se anota un aviso y el tamaño actual pasa a ser la base,
+        para no reintentar la reescritura completa en cada anexado.
+        """
+        self._cerrar_registro()
+        ok, detalle = self._guardar_todo()
+        if ok:
+            self._tam_base = 0
+            self._registros_en_archivo = 0
+            self._sucios.clear()
+        else:
+            self._avisos_carga.append(f"No se pudo compactar '{self._ruta_archivo}'. {detalle}")
+        self._abrir_registro()
+        if not ok:
+            self._tam_base = self._tam_archivo
+        return ok, detalle
+
+    def _linea_a_campos(self, linea: str) -> Tuple[str, str, int, float]:
         """
-        Convierte línea -> Producto.
+        Convierte línea (ya sin espacios en los extremos) -> (id, nombre, cantidad, precio).
+        El escritor no deja espacios alrededor de los campos, así que no se
+        repite strip() por campo; el Producto lo construye quien llama.
         Lanza ValueError si el formato es inválido o los tipos no convierten.
         """
-        partes = linea.strip().split("|")
-        if len(partes) != 4:
+        partes = linea.split("|", 3)
+        if len(partes) != 4 or "|" in partes[3]:
             raise ValueError("Formato inválido. Se esperaba: id|nombre|cantidad|precio")
 
-        id_str = partes[0].strip()
-        nombre = partes[1].strip()
-        cantidad = int(partes[2].strip())
-        precio = float(partes[3].strip())
-
-        if not id_str or not nombre:
+        if not partes[0] or not partes[1]:
             raise ValueError("ID o nombre vacío.")
 
-        # Usa tu constructor real:
-        return Producto(id_str, nombre, cantidad, precio)
+        return partes[0], partes[1], int(partes[2]), float(partes[3])
 
     def _cargar_desde_archivo(self) -> None:
         """
-        Reconstruye la lista desde el archivo.
+        Reconstruye el índice desde el archivo.
+        Las líneas 'id|nombre|cantidad|precio' son la foto base; después se
+        reproducen en orden los registros 'A|...', 'U|...' y 'D|id'.
         Si hay líneas corruptas, se ignoran y se registran avisos.
         """
-        self._productos = []
+        for prod in self._index.values():
+            prod._observador = None
+        self._index = {}
+        self._trigramas = defaultdict(dict)
+        self._columnas.reconstruir(())
+        self._registros_en_archivo = 0
+        self._sucios = {}
         self._avisos_carga = []
 
         try:
-            with open(self._ruta_archivo, "r", encoding="utf-8") as f:
-                for num_linea, linea in enumerate(f, start=1):
-                    linea = linea.strip()
-                    if not linea:
-                        continue
-
-                    try:
-                        prod = self._linea_a_producto(linea)
-
-                        # Evitar duplicados por ID en caso de archivo corrupto
-                        if self._buscar_por_id(prod.get_id()) is None:
-                            self._productos.append(prod)
-                        else:
-                            self._avisos_carga.append(
-                                f"Línea {num_linea}: ID duplicado '{prod.get_id()}'. Se ignoró."
-                            )
-
-                    except (ValueError, TypeError) as e:
-                        self._avisos_carga.append(
-                            f"Línea {num_linea} corrupta. Se ignoró. Detalle: {e}"
-                        )
+            # Se decodifica directamente desde la proyección en memoria del
+            # archivo, sin la copia intermedia del buffer de lectura de Python.
+            # Los '\r' de finales CRLF los absorben strip() y float().
+            with open(self._ruta_archivo, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    lineas = []
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        lineas = str(mm, "utf-8").split("\n")
 
         except FileNotFoundError:
             # Si lo borraron mientras corre, lo recreamos
@@ -106,27 +243,119 @@ class Inventario:
                 f"No se encontró '{self._ruta_archivo}'. Se creó un archivo nuevo vacío."
             )
             self._asegurar_archivo()
+            return
 
         except PermissionError as e:
             self._avisos_carga.append(
                 f"No hay permisos para leer '{self._ruta_archivo}': {e}"
             )
+            return
 
         except OSError as e:
             self._avisos_carga.append(
                 f"Error del sistema leyendo '{self._ruta_archivo}': {e}"
             )
+            return
+
+        # Camino rápido para una foto limpia (lo que escribe _guardar_todo);
+        # ante cualquier anomalía se reprocesa línea a línea con avisos.
+        try:
+            self._index = self._indexar_rapido(lineas)
+        except (ValueError, TypeError, IndexError):
+            self._indexar_con_avisos(lineas)
+
+        self._finalizar_carga()
+
+    def _finalizar_carga(self) -> None:
+        """Reconstruye los índices secundarios a partir de self._index."""
+        for prod in self._index.values():
+            self._agregar_trigramas(prod)
+            prod._observador = self
+        self._columnas.reconstruir(self._index.values())
+
+    def _indexar_rapido(self, lineas: List[str]) -> Dict[str, Producto]:
+        """
+        Construye el índice confiando en el formato del escritor: sin strip()
+        por campo ni validaciones. Cada línea sí se recorta en sus extremos,
+        igual que en _indexar_con_avisos, para que ambos caminos den el mismo ID.
+        Lanza ValueError/IndexError si algo no cuadra.
+        """
+        datos = [linea for linea in map(str.strip, lineas) if linea]
+        index = {
+            partes[0]: Producto(partes[0], partes[1], int(partes[2]), float(partes[3]))
+            for partes in (linea.split("|", 3) for linea in datos)
+        }
+
+        # IDs duplicados, ID vacío o nombre vacío: requieren el camino con avisos
+        if len(index) != len(datos) or "" in index or any(not p._nombre for p in index.values()):
+            raise ValueError("La foto base requiere validación línea a línea.")
+        return index
+
+    def _indexar_con_avisos(self, lineas: List[str]) -> None:
+        """Procesa línea a línea, reproduce registros y anota las líneas corruptas."""
+        self._index = {}
+        self._registros_en_archivo = 0
+
+        for num_linea, linea in enumerate(lineas, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+
+            try:
+                separadores = linea.count("|")
+
+                # Registro de eliminación
+                if separadores == 1 and linea.startswith("D|"):
+                    self._registros_en_archivo += 1
+                    self._index.pop(linea[2:].strip(), None)
+                    continue
+
+                # Registro de actualización: reemplaza el producto completo
+                if separadores == 4 and linea.startswith("U|"):
+                    self._registros_en_archivo += 1
+                    prod = Producto(*self._linea_a_campos(linea[2:]))
+                    self._index[prod._id] = prod
+                    continue
+
+                # Registro de alta o línea de la foto base
+                if separadores == 4 and linea.startswith("A|"):
+                    self._registros_en_archivo += 1
+                    linea = linea[2:]
+                prod = Producto(*self._linea_a_campos(linea))
+
+                # Evitar duplicados por ID en caso de archivo corrupto
+                if prod._id not in self._index:
+                    self._index[prod._id] = prod
+                else:
+                    self._avisos_carga.append(
+                        f"Línea {num_linea}: ID duplicado '{prod._id}'. Se ignoró."
+                    )
+
+            except (ValueError, TypeError) as e:
+                self._avisos_carga.append(
+                    f"Línea {num_linea} corrupta. Se ignoró. Detalle: {e}"
+                )
 
     def _guardar_todo(self) -> Tuple[bool, str]:
         """
         Guarda TODO el inventario.
         Usa archivo temporal + os.replace para reducir riesgo de corrupción.
+        Todo el contenido se arma en un único buffer y se escribe de una vez.
         """
         tmp_path = f"{self._ruta_archivo}.tmp"
         try:
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                for p in self._productos:
-                    f.write(self._producto_a_linea(p) + "\n")
+            buf = "".join(
+                [f"{self._producto_a_linea(p)}\n" for p in self._index.values()]
+            ).encode("utf-8")
+
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                escritos = os.write(fd, buf)
+                while escritos < len(buf):
+                    escritos += os.write(fd, buf[escritos:])
+                os.fsync(fd)
+            finally:
+                os.close(fd)
 
             os.replace(tmp_path, self._ruta_archivo)
             return True, f"Inventario guardado en '{self._ruta_archivo}'."
@@ -138,58 +367,135 @@ class Inventario:
             return False, f"Error del sistema al guardar '{self._ruta_archivo}': {e}"
 
         finally:
-            # Limpieza del temporal si quedó
+            # Limpieza del temporal si quedó (tras os.replace ya no existe)
             try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
             except OSError:
                 pass
 
     def obtener_avisos_carga(self) -> List[str]:
-        """Avisos (líneas corruptas, permisos, etc.) generados al cargar."""
+        """Avisos (líneas corruptas, permisos, compactación fallida, etc.) generados al cargar o al compactar."""
         return list(self._avisos_carga)
 
     # -------------------------
     # Utilidad interna
     # -------------------------
 
+    @staticmethod
+    def _trigramas_de(texto: str) -> Set[str]:
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def _agregar_trigramas(self, producto: Producto, nombre_lower: Optional[str] = None) -> None:
+        if nombre_lower is None:
+            nombre_lower = producto._nombre_lower
+        for tri in self._trigramas_de(nombre_lower):
+            self._trigramas[tri][producto._id] = None
+
+    def _quitar_trigramas(self, producto: Producto) -> None:
+        for tri in self._trigramas_de(producto._nombre_lower):
+            ids = self._trigramas.get(tri)
+            if ids is not None:
+                ids.pop(producto._id, None)
+                if not ids:
+                    del self._trigramas[tri]
+
+    # Avisos de los setters de Producto (se llaman antes de asignar el valor nuevo)
+
+    def _al_cambiar_valores(self, producto: Producto, cantidad, precio) -> None:
+        self._columnas.actualizar(producto, cantidad, precio)
+        self._sucios[producto._id] = None
+
+    def _al_cambiar_nombre(self, producto: Producto, nombre: str) -> None:
+        # Primero lo que puede fallar (p. ej. nombre None), luego el índice
+        nombre_lower = nombre.lower()
+        self._quitar_trigramas(producto)
+        self._agregar_trigramas(producto, nombre_lower)
+        self._sucios[producto._id] = None
+
     def _buscar_por_id(self, id: str) -> Optional[Producto]:
-        for producto in self._productos:
-            if producto.get_id() == id:
-                return producto
-        return None
+        return self._index.get(id)
 
     # -------------------------
     # Métodos públicos (persistentes)
     # -------------------------
 
     def anadir_producto(self, producto: Producto, notificar: bool = False) -> Tuple[bool, str]:
-        if self._buscar_por_id(producto.get_id()) is not None:
-            msg = f"No se agregó: ya existe un producto con ID '{producto.get_id()}'."
+        if producto._id in self._index:
+            msg = f"No se agregó: ya existe un producto con ID '{producto._id}'."
             if notificar:
                 print(msg)
             return False, msg
 
-        self._productos.append(producto)
+        # Un producto solo puede pertenecer a un inventario (un único _observador)
+        if producto._observador is not None:
+            msg = f"No se agregó: el producto con ID '{producto._id}' ya pertenece a otro inventario."
+            if notificar:
+                print(msg)
+            return False, msg
 
-        ok, detalle = self._guardar_todo()
+        self._index[producto._id] = producto
+        self._agregar_trigramas(producto)
+        self._columnas.agregar(producto)
+        producto._observador = self
+
+        ok, detalle = self._anexar_registro("A", self._producto_a_linea(producto))
         msg = "Producto agregado y guardado." if ok else f"Agregado en memoria, pero NO se pudo guardar. {detalle}"
 
         if notificar:
             print(msg)
         return ok, msg
 
+    def anadir_productos(self, productos: Iterable[Producto], notificar: bool = False) -> Tuple[int, int, bool]:
+        """
+        Alta masiva: filtra duplicados (y productos de otro inventario) en
+        memoria y persiste todos los registros con una sola escritura y un
+        solo fsync.
+        Devuelve (agregados, omitidos, guardado); guardado es False si los
+        productos quedaron solo en memoria porque la escritura falló.
+        """
+        buf = io.BytesIO()
+        agregados = 0
+        omitidos = 0
+
+        for producto in productos:
+            if producto._id in self._index or producto._observador is not None:
+                omitidos += 1
+                continue
+
+            self._index[producto._id] = producto
+            self._agregar_trigramas(producto)
+            self._columnas.agregar(producto)
+            producto._observador = self
+            buf.write(f"A|{self._producto_a_linea(producto)}\n".encode("utf-8"))
+            agregados += 1
+
+        if agregados:
+            ok, detalle = self._escribir_registros(buf.getvalue(), sincronizar=True)
+        else:
+            ok, detalle = True, ""
+
+        if notificar:
+            if ok:
+                print(f"{agregados} producto(s) agregado(s) y guardado(s), {omitidos} omitido(s) por ID repetido.")
+            else:
+                print(f"{agregados} producto(s) agregado(s) en memoria, pero NO se pudo guardar. {detalle}")
+        return agregados, omitidos, ok
+
     def eliminar_producto(self, id: str, notificar: bool = False) -> Tuple[bool, str]:
-        producto = self._buscar_por_id(id)
+        producto = self._index.pop(id, None)
         if producto is None:
             msg = f"No se eliminó: no existe producto con ID '{id}'."
             if notificar:
                 print(msg)
             return False, msg
 
-        self._productos.remove(producto)
-
-        ok, detalle = self._guardar_todo()
+        producto._observador = None
+        self._quitar_trigramas(producto)
+        self._columnas.quitar(producto)
+        self._sucios.pop(id, None)
+        ok, detalle = self._anexar_registro("D", id)
         msg = "Producto eliminado y guardado." if ok else f"Eliminado en memoria, pero NO se pudo guardar. {detalle}"
 
         if notificar:
@@ -213,10 +519,25 @@ class Inventario:
         # Aquí dejamos que tus setters validen y lancen ValueError si aplica
         try:
             if nueva_cantidad is not None:
-                producto.set_cantidad(int(nueva_cantidad))
+                nueva_cantidad = int(nueva_cantidad)
+            if nuevo_precio is not None:
+                nuevo_precio = float(nuevo_precio)
+
+            # Sin cambios reales: no se toca el disco
+            if (
+                (nueva_cantidad is None or nueva_cantidad == producto._cantidad)
+                and (nuevo_precio is None or nuevo_precio == producto._precio)
+            ):
+                msg = "Sin cambios."
+                if notificar:
+                    print(msg)
+                return True, msg
+
+            if nueva_cantidad is not None:
+                producto.set_cantidad(nueva_cantidad)
 
             if nuevo_precio is not None:
-                producto.set_precio(float(nuevo_precio))
+                producto.set_precio(nuevo_precio)
 
         except (ValueError, TypeError) as e:
             msg = f"Datos inválidos, no se actualizó. Detalle: {e}"
@@ -224,7 +545,9 @@ class Inventario:
                 print(msg)
             return False, msg
 
-        ok, detalle = self._guardar_todo()
+        # Los setters lo marcaron como pendiente; este registro ya lo cubre
+        self._sucios.pop(id, None)
+        ok, detalle = self._anexar_registro("U", self._producto_a_linea(producto))
         msg = "Producto actualizado y guardado." if ok else f"Actualizado en memoria, pero NO se pudo guardar. {detalle}"
 
         if notificar:
@@ -232,8 +555,33 @@ class Inventario:
         return ok, msg
 
     def buscar_por_nombre(self, texto: str) -> List[Producto]:
+        # Se compara contra el nombre en minúsculas ya precalculado en Producto
         texto = (texto or "").lower()
-        return [p for p in self._productos if texto in p.get_nombre().lower()]
+        if len(texto) < 3:
+            return [p for p in self._index.values() if texto in p._nombre_lower]
+
+        # Candidatos: IDs presentes en todos los trigramas de la consulta
+        listas = []
+        for tri in self._trigramas_de(texto):
+            ids = self._trigramas.get(tri)
+            if not ids:
+                return []
+            listas.append(ids)
+        listas.sort(key=len)
+        menor, resto = listas[0], listas[1:]
+
+        resultados = []
+        for id_ in menor:
+            if all(id_ in ids for ids in resto):
+                p = self._index.get(id_)
+                # Confirmación exacta de la subcadena
+                if p is not None and texto in p._nombre_lower:
+                    resultados.append(p)
+        return resultados
 
     def listar_productos(self) -> List[Producto]:
-        return self._productos
\ No newline at end of file
+        return list(self._index.values())
+
+    def total_valor(self) -> float:
+        """Valor total del inventario (suma de cantidad * precio)."""
+        return self._columnas.total_valor()
\ No newline at end of file